@@ -23,7 +23,7 @@ from __future__ import annotations
 
 import sys
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Iterable, Union
+from typing import TYPE_CHECKING, Any, Iterable, Union, cast
 
 import numpy as np
 from openpulse import ast
@@ -47,6 +47,8 @@ class OQPyExpression:
     ``==`` which produces a new expression instead of producing a python boolean.
     """
 
+    __slots__ = ()
+
     type: ast.ClassicalType
 
     def to_ast(self, program: Program) -> ast.Expression:
@@ -108,6 +110,8 @@ def expr_matches(a: Any, b: Any) -> bool:
 
     This bypasses calling ``__eq__`` on expr objects.
     """
+    if a is b:
+        return True
     if type(a) is not type(b):
         return False
     if isinstance(a, (list, np.ndarray)):
@@ -118,12 +122,38 @@ def expr_matches(a: Any, b: Any) -> bool:
         if a.keys() != b.keys():
             return False
         return all(expr_matches(va, b[k]) for k, va in a.items())
-    if hasattr(a, "__dict__"):
-        return expr_matches(a.__dict__, b.__dict__)
+    if hasattr(a, "__dict__") or _slot_names(type(a)):
+        return expr_matches(_attributes(a), _attributes(b))
     else:
         return a == b
 
 
+_slot_names_cache: dict[type, tuple[str, ...]] = {}
+
+
+def _slot_names(cls: type) -> tuple[str, ...]:
+    """Return the names of the slots defined on a class and its base classes."""
+    names = _slot_names_cache.get(cls)
+    if names is None:
+        all_names: list[str] = []
+        for base in cls.__mro__:
+            slots = base.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            all_names.extend(name for name in slots if name not in ("__dict__", "__weakref__"))
+        names = _slot_names_cache[cls] = tuple(all_names)
+    return names
+
+
+def _attributes(obj: Any) -> dict[str, Any]:
+    """Return the instance attributes of an object, whether stored in slots or ``__dict__``."""
+    attributes = dict(getattr(obj, "__dict__", {}))
+    for name in _slot_names(type(obj)):
+        if hasattr(obj, name):
+            attributes[name] = getattr(obj, name)
+    return attributes
+
+
 @runtime_checkable
 class ExpressionConvertible(Protocol):
     """This is the protocol an object can implement in order to be usable as an expression."""
@@ -132,9 +162,25 @@ class ExpressionConvertible(Protocol):
         ...
 
 
+@runtime_checkable
+class CachedExpressionConvertible(Protocol):
+    """Protocol for expression convertible objects whose conversion may be cached.
+
+    Implementing ``_to_cached_oqpy_expression`` promises that the returned expression
+    does not change over the lifetime of the object, so that a program only needs to
+    request it once, no matter how many times the object is used. The expression is
+    still converted to a new ast node on every use.
+    """
+
+    def _to_cached_oqpy_expression(self) -> HasToAst:
+        ...
+
+
 class OQPyBinaryExpression(OQPyExpression):
     """An expression consisting of two subexpressions joined by an operator."""
 
+    __slots__ = ("op", "lhs", "rhs", "type")
+
     def __init__(self, op: ast.BinaryOperator, lhs: AstConvertible, rhs: AstConvertible):
         super().__init__()
         self.op = op
@@ -157,6 +203,8 @@ class OQPyBinaryExpression(OQPyExpression):
 class Var(ABC):
     """Abstract base class for both classical and quantum variables."""
 
+    __slots__ = ("name", "_needs_declaration")
+
     def __init__(self, name: str, needs_declaration: bool = True):
         self.name = name
         self._needs_declaration = needs_declaration
@@ -192,31 +240,31 @@ class HasToAst(Protocol):
 
 
 AstConvertible = Union[
-    HasToAst, bool, int, float, complex, Iterable, ExpressionConvertible, ast.Expression
+    HasToAst,
+    bool,
+    int,
+    float,
+    complex,
+    Iterable,
+    ExpressionConvertible,
+    CachedExpressionConvertible,
+    ast.Expression,
 ]
 
 
 def to_ast(program: Program, item: AstConvertible) -> ast.Expression:
     """Convert an object to an AST node."""
+    if hasattr(item, "_to_cached_oqpy_expression"):
+        # Keep a reference to the item in the cache so that its id cannot be reused.
+        item = cast(CachedExpressionConvertible, item)
+        cached = program.expr_cache.get(id(item))
+        if cached is None or cached[0] is not item:
+            cached = program.expr_cache[id(item)] = (item, item._to_cached_oqpy_expression())
+        return cached[1].to_ast(program)
     if hasattr(item, "_to_oqpy_expression"):
         return item._to_oqpy_expression().to_ast(program)  # type: ignore[union-attr]
     if isinstance(item, (complex, np.complexfloating)):
-        if item.imag == 0:
-            return to_ast(program, item.real)
-        if item.real == 0:
-            if item.imag < 0:
-                return ast.UnaryExpression(ast.UnaryOperator["-"], ast.ImaginaryLiteral(-item.imag))
-            else:
-                return ast.ImaginaryLiteral(item.imag)
-        if item.imag < 0:
-            return ast.BinaryExpression(
-                ast.BinaryOperator["-"],
-                ast.FloatLiteral(item.real),
-                ast.ImaginaryLiteral(-item.imag),
-            )
-        return ast.BinaryExpression(
-            ast.BinaryOperator["+"], ast.FloatLiteral(item.real), ast.ImaginaryLiteral(item.imag)
-        )
+        return _complex_to_ast(program, item.real, item.imag)
     if isinstance(item, (bool, np.bool_)):
         return ast.BooleanLiteral(item)
     if isinstance(item, (int, np.integer)):
@@ -227,6 +275,8 @@ def to_ast(program: Program, item: AstConvertible) -> ast.Expression:
         if item < 0:
             return ast.UnaryExpression(ast.UnaryOperator["-"], ast.FloatLiteral(-item))
         return ast.FloatLiteral(item)
+    if isinstance(item, np.ndarray) and item.ndim > 0:
+        return ast.ArrayLiteral(_ndarray_to_ast(program, item))
     if isinstance(item, Iterable):
         return ast.ArrayLiteral([to_ast(program, i) for i in item])
     if isinstance(item, ast.Expression):
@@ -236,6 +286,46 @@ def to_ast(program: Program, item: AstConvertible) -> ast.Expression:
     raise TypeError(f"Cannot convert {item} of type {type(item)} to ast")
 
 
+def _complex_to_ast(program: Program, real: Any, imag: Any) -> ast.Expression:
+    """Convert the real and imaginary parts of a complex number into an AST node."""
+    if imag == 0:
+        return to_ast(program, real)
+    if real == 0:
+        if imag < 0:
+            return ast.UnaryExpression(ast.UnaryOperator["-"], ast.ImaginaryLiteral(-imag))
+        else:
+            return ast.ImaginaryLiteral(imag)
+    if imag < 0:
+        return ast.BinaryExpression(
+            ast.BinaryOperator["-"],
+            ast.FloatLiteral(real),
+            ast.ImaginaryLiteral(-imag),
+        )
+    return ast.BinaryExpression(
+        ast.BinaryOperator["+"], ast.FloatLiteral(real), ast.ImaginaryLiteral(imag)
+    )
+
+
+def _ndarray_to_ast(program: Program, values: np.ndarray) -> list[ast.Expression]:
+    """Convert the elements of a numpy array into AST nodes.
+
+    Arrays of python-sized scalars (bool, integer, float64 and complex128) are converted to
+    python scalars in a single pass, and complex arrays are split into real and imaginary parts
+    up front instead of inspecting each element. Narrower dtypes such as float32 keep their
+    numpy scalars so that they are not printed with spurious float64 digits. Complex arrays
+    without any imaginary component are converted as real arrays.
+    """
+    if np.iscomplexobj(values) and not values.imag.any():
+        values = values.real
+    exact = values.dtype.kind in "biu" or values.dtype in (np.float64, np.complex128)
+    if values.ndim == 1 and np.iscomplexobj(values):
+        real, imag = values.real, values.imag
+        if exact:
+            real, imag = real.tolist(), imag.tolist()
+        return [_complex_to_ast(program, re, im) for re, im in zip(real, imag)]
+    return [to_ast(program, value) for value in (values.tolist() if exact else values)]
+
+
 def optional_ast(program: Program, item: AstConvertible | None) -> ast.Expression | None:
     """Convert item to ast if it is not None."""
     if item is None:
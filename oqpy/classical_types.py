@@ -142,6 +142,8 @@ class _ClassicalVar(Var, OQPyExpression):
     Subclasses should supply the type_cls class variable.
     """
 
+    __slots__ = ("type", "init_expression")
+
     type_cls: Type[ast.ClassicalType]
 
     def __init__(
@@ -170,12 +172,16 @@ class _ClassicalVar(Var, OQPyExpression):
 class BoolVar(_ClassicalVar):
     """An (unsized) oqpy variable with bool type."""
 
+    __slots__ = ()
+
     type_cls = ast.BoolType
 
 
 class _SizedVar(_ClassicalVar):
     """Base class for variables with a specified size."""
 
+    __slots__ = ("size",)
+
     default_size: int | None = None
     size: int | None
 
@@ -201,6 +207,8 @@ _SizedVarT = TypeVar("_SizedVarT", bound=_SizedVar)
 class IntVar(_SizedVar):
     """An oqpy variable with integer type."""
 
+    __slots__ = ()
+
     type_cls = ast.IntType
     default_size = 32
 
@@ -208,6 +216,8 @@ class IntVar(_SizedVar):
 class UintVar(_SizedVar):
     """An oqpy variable with unsigned integer type."""
 
+    __slots__ = ()
+
     type_cls = ast.UintType
     default_size = 32
 
@@ -215,6 +225,8 @@ class UintVar(_SizedVar):
 class FloatVar(_SizedVar):
     """An oqpy variable with floating type."""
 
+    __slots__ = ()
+
     type_cls = ast.FloatType
     default_size = 64
 
@@ -222,6 +234,8 @@ class FloatVar(_SizedVar):
 class AngleVar(_SizedVar):
     """An oqpy variable with angle type."""
 
+    __slots__ = ()
+
     type_cls = ast.AngleType
     default_size = 32
 
@@ -229,6 +243,8 @@ class AngleVar(_SizedVar):
 class BitVar(_SizedVar):
     """An oqpy variable with bit type."""
 
+    __slots__ = ()
+
     type_cls = ast.BitType
 
     def __getitem__(self, idx: Union[int, slice, Iterable[int]]) -> BitVar:
@@ -252,6 +268,8 @@ class BitVar(_SizedVar):
 class ComplexVar(_ClassicalVar):
     """An oqpy variable with bit type."""
 
+    __slots__ = ()
+
     type_cls = ast.ComplexType
 
     def __class_getitem__(cls, item: Type[ast.FloatType]) -> Callable[..., ComplexVar]:
@@ -274,6 +292,8 @@ class ComplexVar(_ClassicalVar):
 class DurationVar(_ClassicalVar):
     """An oqpy variable with duration type."""
 
+    __slots__ = ()
+
     type_cls = ast.DurationType
 
     def __init__(
@@ -291,12 +311,16 @@ class DurationVar(_ClassicalVar):
 class StretchVar(_ClassicalVar):
     """An oqpy variable with stretch type."""
 
+    __slots__ = ()
+
     type_cls = ast.StretchType
 
 
 class OQFunctionCall(OQPyExpression):
     """An oqpy expression corresponding to a function call."""
 
+    __slots__ = ("identifier", "args", "type", "extern_decl", "subroutine_decl")
+
     def __init__(
         self,
         identifier: Union[str, ast.Identifier],
@@ -330,7 +354,7 @@ class OQFunctionCall(OQPyExpression):
     def to_ast(self, program: Program) -> ast.Expression:
         """Converts the OQpy expression into an ast node."""
         if self.extern_decl is not None:
-            program.externs[self.identifier.name] = self.extern_decl
+            program._add_extern(self.identifier.name, self.extern_decl)
         if self.subroutine_decl is not None:
             program._add_subroutine(self.identifier.name, self.subroutine_decl)
         return ast.FunctionCall(self.identifier, map_to_ast(program, self.args))
@@ -20,9 +20,10 @@ from __future__ import annotations
 import contextlib
 from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 
+import numpy as np
 from openpulse import ast
 
-from oqpy.base import OQPyExpression, to_ast
+from oqpy.base import OQPyExpression, _ndarray_to_ast, to_ast
 from oqpy.classical_types import AstConvertible, IntVar, _ClassicalVar, convert_range
 
 if TYPE_CHECKING:
@@ -89,7 +90,10 @@ def ForIn(
     state = program._pop()
 
     if isinstance(iterator, range):
+        # Ranges map directly onto a range definition, without iterating over them.
         iterator = convert_range(program, iterator)
+    elif isinstance(iterator, np.ndarray):
+        iterator = ast.DiscreteSet(_ndarray_to_ast(program, iterator))
     elif isinstance(iterator, Iterable):
         iterator = ast.DiscreteSet([to_ast(program, i) for i in iterator])
     elif isinstance(iterator, _ClassicalVar):
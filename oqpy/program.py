@@ -23,8 +23,8 @@ AST components), and the class has methods which add to the current state.
 
 from __future__ import annotations
 
-from copy import deepcopy
-from typing import Any, Iterable, Iterator, Optional
+from copy import copy, deepcopy
+from typing import Any, Iterable, Iterator, Optional, TypeVar
 
 from openpulse import ast
 from openpulse.printer import dumps
@@ -33,6 +33,8 @@ from openqasm3.visitor import QASMVisitor
 from oqpy import classical_types, quantum_types
 from oqpy.base import (
     AstConvertible,
+    CachedExpressionConvertible,
+    HasToAst,
     Var,
     expr_matches,
     map_to_ast,
@@ -44,6 +46,8 @@ from oqpy.timing import make_duration
 
 __all__ = ["Program"]
 
+_NodeT = TypeVar("_NodeT", bound=ast.QASMNode)
+
 
 class ProgramState:
     """Represents the current program state at a particular context level.
@@ -57,6 +61,14 @@ class ProgramState:
         self.body: list[ast.Statement] = []
         self.if_clause: Optional[ast.BranchingStatement] = None
 
+    def __copy__(self) -> ProgramState:
+        """Return a copy of the state which shares finished statements with the original."""
+        new_state = ProgramState()
+        new_state.body = list(self.body)
+        # A pending if clause can still receive an else block, so it must not be shared.
+        new_state.if_clause = deepcopy(self.if_clause)
+        return new_state
+
     def add_if_clause(self, condition: ast.Expression, if_clause: list[ast.Statement]) -> None:
         self.finalize_if_clause()
         self.if_clause = ast.BranchingStatement(condition, if_clause, [])
@@ -87,6 +99,11 @@ class Program:
         self.externs: dict[str, ast.ExternDeclaration] = {}
         self.declared_vars: dict[str, Var] = {}
         self.undeclared_vars: dict[str, Var] = {}
+        self.expr_cache: dict[int, tuple[CachedExpressionConvertible, HasToAst]] = {}
+        # Incremented by every method which modifies the program, so that the output of
+        # to_qasm can be reused until the program changes.
+        self._version = 0
+        self._qasm_cache: Optional[tuple[tuple[Any, ...], str]] = None
 
         if version is None or (
             len(version.split(".")) in [1, 2]
@@ -100,9 +117,11 @@ class Program:
         """In-place concatenation of programs."""
         if len(other.stack) > 1:
             raise RuntimeError("Cannot add subprogram with unclosed contextmanagers.")
+        self._version += 1
         self._state.finalize_if_clause()
         self._state.body.extend(other._state.body)
-        self._state.if_clause = other._state.if_clause
+        # A pending if clause can still receive an else block in other, so it must not be shared.
+        self._state.if_clause = deepcopy(other._state.if_clause)
         self._state.finalize_if_clause()
         self.defcals.update(other.defcals)
         self.subroutines.update(other.subroutines)
@@ -116,10 +135,29 @@ class Program:
     def __add__(self, other: Program) -> Program:
         """Return concatenation of two programs."""
         assert isinstance(other, Program)
-        self_copy = deepcopy(self)
+        self_copy = copy(self)
         self_copy += other
         return self_copy
 
+    def __copy__(self) -> Program:
+        """Return a copy of the program which shares ast nodes with the original.
+
+        Statements are not modified once they have been added to a program (conversion to
+        ast copies any statement it needs to change), so only the containers tracking them
+        are copied. The copy can then be extended (e.g. via ``+=``) without affecting the
+        original program.
+        """
+        new_prog = type(self).__new__(type(self))
+        new_prog.__dict__.update(self.__dict__)
+        new_prog.stack = [copy(state) for state in self.stack]
+        new_prog.defcals = dict(self.defcals)
+        new_prog.subroutines = dict(self.subroutines)
+        new_prog.externs = dict(self.externs)
+        new_prog.declared_vars = dict(self.declared_vars)
+        new_prog.undeclared_vars = dict(self.undeclared_vars)
+        new_prog.expr_cache = dict(self.expr_cache)
+        return new_prog
+
     @property
     def _state(self) -> ProgramState:
         """The current program state is found on the top of the stack."""
@@ -141,10 +179,12 @@ class Program:
 
     def _push(self) -> None:
         """Open a new context by pushing a new program state on the stack."""
+        self._version += 1
         self.stack.append(ProgramState())
 
     def _pop(self) -> ProgramState:
         """Close a context by removing the program state from the top stack, and return it."""
+        self._version += 1
         state = self.stack.pop()
         state.finalize_if_clause()
         return state
@@ -162,8 +202,11 @@ class Program:
         existing_var = self.declared_vars.get(name)
         if existing_var is None:
             existing_var = self.undeclared_vars.get(name)
+        if existing_var is var:
+            return
         if existing_var is not None and not expr_matches(var, existing_var):
             raise RuntimeError(f"Program has conflicting variables with name {name}")
+        self._version += 1
         if name not in self.declared_vars:
             self.undeclared_vars[name] = var
 
@@ -173,6 +216,7 @@ class Program:
         name = var.name
         new_var = self.undeclared_vars.pop(name, None)
         if new_var is not None:
+            self._version += 1
             self.declared_vars[name] = new_var
 
     def autodeclare(self, encal: bool = False) -> None:
@@ -186,6 +230,7 @@ class Program:
 
     def _add_statement(self, stmt: ast.Statement) -> None:
         """Add a statment to the current context's program state."""
+        self._version += 1
         self._state.add_statement(stmt)
 
     def _add_subroutine(self, name: str, stmt: ast.SubroutineDefinition) -> None:
@@ -193,13 +238,23 @@ class Program:
 
         Subroutines are added to the top of the program upon conversion to ast.
         """
+        self._version += 1
         self.subroutines[name] = stmt
 
+    def _add_extern(self, name: str, stmt: ast.ExternDeclaration) -> None:
+        """Register an extern which has been used.
+
+        Extern declarations are added to the top of the program upon conversion to ast.
+        """
+        self._version += 1
+        self.externs[name] = stmt
+
     def _add_defcal(self, qubit_name: str, name: str, stmt: ast.CalibrationDefinition) -> None:
         """Register a defcal which has been used.
 
         Defcals are added to the top of the program upon conversion to ast.
         """
+        self._version += 1
         self.defcals[(qubit_name, name)] = stmt
 
     def _make_externs_statements(self, auto_encal: bool = False) -> list[ast.ExternDeclaration]:
@@ -251,14 +306,17 @@ class Program:
 
         assert len(self.stack) == 1
         self._state.finalize_if_clause()
-        statements = []
+        statements: list[ast.Statement] = []
+        if encal_declarations:
+            statements.append(ast.CalibrationGrammarDeclaration("openpulse"))
+        # Statements are appended to a single list, which is wrapped in a cal block if needed.
+        body = [] if encal else statements
         if include_externs:
-            statements += self._make_externs_statements(encal_declarations)
-        statements += list(self.subroutines.values()) + self._state.body
+            body.extend(self._make_externs_statements(encal_declarations))
+        body.extend(self.subroutines.values())
+        body.extend(self._state.body)
         if encal:
-            statements = [ast.CalibrationStatement(statements)]
-        if encal_declarations:
-            statements = [ast.CalibrationGrammarDeclaration("openpulse")] + statements
+            statements.append(ast.CalibrationStatement(body))
         prog = ast.Program(statements=statements, version=self.version)
         if encal_declarations:
             MergeCalStatementsPass().visit(prog)
@@ -273,9 +331,22 @@ class Program:
     ) -> str:
         """Convert to QASM text.
 
-        See to_ast for option documentation.
+        See to_ast for option documentation. The result is reused by subsequent calls
+        with the same options until the program is modified through its methods or its
+        version is changed. Conversion never modifies the statements of the program in
+        place, so the reused text matches a fresh conversion as long as ast nodes taken
+        from or added to the program are not modified by the caller.
         """
-        return dumps(
+        options = (
+            self.version,
+            encal,
+            include_externs,
+            ignore_needs_declaration,
+            encal_declarations,
+        )
+        if self._qasm_cache is not None and self._qasm_cache[0] == (self._version, *options):
+            return self._qasm_cache[1]
+        qasm = dumps(
             self.to_ast(
                 encal=encal,
                 include_externs=include_externs,
@@ -284,6 +355,9 @@ class Program:
             ),
             indent="    ",
         ).strip()
+        # to_ast may itself declare variables, so use the version after conversion.
+        self._qasm_cache = ((self._version, *options), qasm)
+        return qasm
 
     def declare(
         self,
@@ -315,6 +389,7 @@ class Program:
         if to_beginning:
             openqasm_vars.reverse()
 
+        self._version += 1
         for var in openqasm_vars:
             stmt = var.make_declaration_statement(self)
             if to_beginning:
@@ -469,36 +544,59 @@ class Program:
 
 
 class MergeCalStatementsPass(QASMVisitor[None]):
-    """Merge adjacent CalibrationStatement ast nodes."""
+    """Merge adjacent CalibrationStatement ast nodes.
+
+    Statements may be shared between programs, so statements containing merged bodies are
+    replaced by modified copies rather than being changed in place. Only the ast.Program
+    node passed to the pass is modified.
+    """
 
     def visit_Program(self, node: ast.Program, context: None = None) -> None:
         node.statements = self.process_statement_list(node.statements)
-        self.generic_visit(node, context)
 
-    def visit_ForInLoop(self, node: ast.ForInLoop, context: None = None) -> None:
-        node.block = self.process_statement_list(node.block)
-        self.generic_visit(node, context)
+    def visit_ForInLoop(self, node: ast.ForInLoop, context: None = None) -> ast.ForInLoop:
+        return self._replace_blocks(node, "block")
 
-    def visit_WhileLoop(self, node: ast.WhileLoop, context: None = None) -> None:
-        node.block = self.process_statement_list(node.block)
-        self.generic_visit(node, context)
+    def visit_WhileLoop(self, node: ast.WhileLoop, context: None = None) -> ast.WhileLoop:
+        return self._replace_blocks(node, "block")
 
-    def visit_BranchingStatement(self, node: ast.BranchingStatement, context: None = None) -> None:
-        node.if_block = self.process_statement_list(node.if_block)
-        node.else_block = self.process_statement_list(node.else_block)
-        self.generic_visit(node, context)
+    def visit_BranchingStatement(
+        self, node: ast.BranchingStatement, context: None = None
+    ) -> ast.BranchingStatement:
+        return self._replace_blocks(node, "if_block", "else_block")
 
     def visit_CalibrationStatement(
         self, node: ast.CalibrationStatement, context: None = None
-    ) -> None:
-        node.body = self.process_statement_list(node.body)
-        self.generic_visit(node, context)
+    ) -> ast.CalibrationStatement:
+        return self._replace_blocks(node, "body")
 
     def visit_SubroutineDefinition(
         self, node: ast.SubroutineDefinition, context: None = None
-    ) -> None:
-        node.body = self.process_statement_list(node.body)
-        self.generic_visit(node, context)
+    ) -> ast.SubroutineDefinition:
+        return self._replace_blocks(node, "body")
+
+    def generic_visit(self, node: ast.QASMNode, context: None = None) -> ast.QASMNode:
+        # Cal statements can only be nested in the bodies of other statements, so there
+        # is no need to walk into expressions. This leaves printing as the only pass
+        # over the full tree when converting to qasm.
+        changes: dict[str, Any] = {}
+        for key, value in node.__dict__.items():
+            if isinstance(value, ast.Statement):
+                changes[key] = self.visit(value)
+            elif isinstance(value, list) and any(isinstance(v, ast.Statement) for v in value):
+                changes[key] = [self.visit(v) if isinstance(v, ast.Statement) else v for v in value]
+        if not changes:
+            return node
+        new_node = copy(node)
+        new_node.__dict__.update(changes)
+        return new_node
+
+    def _replace_blocks(self, node: _NodeT, *block_names: str) -> _NodeT:
+        """Return a copy of node where the named statement lists have been processed."""
+        new_node = copy(node)
+        for block_name in block_names:
+            setattr(new_node, block_name, self.process_statement_list(getattr(node, block_name)))
+        return new_node
 
     def process_statement_list(self, statements: list[ast.Statement]) -> list[ast.Statement]:
         new_list = []
@@ -515,4 +613,4 @@ class MergeCalStatementsPass(QASMVisitor[None]):
         if cal_stmts:
             new_list.append(ast.CalibrationStatement(body=cal_stmts))
 
-        return new_list
+        return [self.visit(stmt) for stmt in new_list]
@@ -30,6 +30,8 @@ __all__ = ["PortVar", "WaveformVar", "FrameVar"]
 class PortVar(_ClassicalVar):
     """A variable type corresponding to an OpenPulse port."""
 
+    __slots__ = ()
+
     type_cls = ast.PortType
 
     def __init__(self, name: str | None = None, **kwargs: Any):
@@ -39,6 +41,8 @@ class PortVar(_ClassicalVar):
 class WaveformVar(_ClassicalVar):
     """A variable type corresponding to an OpenPulse waveform."""
 
+    __slots__ = ()
+
     type_cls = ast.WaveformType
 
     def __init__(
@@ -54,6 +58,8 @@ class WaveformVar(_ClassicalVar):
 class FrameVar(_ClassicalVar):
     """A variable type corresponding to an OpenPulse frame."""
 
+    __slots__ = ()
+
     type_cls = ast.FrameType
 
     def __init__(
@@ -34,6 +34,8 @@ __all__ = ["Qubit", "QubitArray", "defcal", "PhysicalQubits", "Cal"]
 class Qubit(Var):
     """OQpy variable representing a single qubit."""
 
+    __slots__ = ()
+
     def __init__(self, name: str, needs_declaration: bool = True):
         super().__init__(name, needs_declaration=needs_declaration)
         self.name = name
@@ -19,7 +19,7 @@ from __future__ import annotations
 
 import functools
 import inspect
-from typing import Callable, get_type_hints
+from typing import Any, Callable, Optional, get_type_hints
 
 from mypy_extensions import VarArg
 from openpulse import ast
@@ -34,6 +34,9 @@ __all__ = ["subroutine", "declare_extern", "declare_waveform_generator"]
 
 SubroutineParams = [oqpy.Program, VarArg(AstConvertible)]
 
+# Maximum number of distinct calls remembered for each declared extern.
+_EXTERN_CALL_CACHE_SIZE = 4096
+
 
 def subroutine(
     func: Callable[[oqpy.Program, VarArg(AstConvertible)], AstConvertible | None]
@@ -137,8 +140,12 @@ def declare_extern(
         [ast.ExternArgument(type=t) for t in arg_types],
         ast.ExternArgument(type=return_type),
     )
+    call_cache: dict[tuple[Any, ...], OQFunctionCall] = {}
 
     def call_extern(*call_args: AstConvertible, **call_kwargs: AstConvertible) -> OQFunctionCall:
+        key = _extern_call_key(call_args, call_kwargs)
+        if key is not None and key in call_cache:
+            return call_cache[key]
         new_args = list(call_args) + [None] * len(call_kwargs)
 
         # Testing that the number of arguments is equal to what's defined by the prototype
@@ -166,11 +173,29 @@ def declare_extern(
         for i, a in enumerate(call_args):
             if type(arg_types[i]) == ast.DurationType:
                 new_args[i] = make_duration(a)
-        return OQFunctionCall(name, new_args, return_type, extern_decl=extern_decl)
+        call = OQFunctionCall(name, new_args, return_type, extern_decl=extern_decl)
+        if key is not None and len(call_cache) < _EXTERN_CALL_CACHE_SIZE:
+            call_cache[key] = call
+        return call
 
     return call_extern
 
 
+def _extern_call_key(
+    call_args: tuple[AstConvertible, ...], call_kwargs: dict[str, AstConvertible]
+) -> Optional[tuple[Any, ...]]:
+    """Return a key identifying an extern call with only numeric arguments, or None.
+
+    Calls with equal keys produce identical function call expressions, so the expression
+    can be shared between them. Numbers are keyed by type and repr since e.g. ``1``, ``1.0``
+    and ``-0.0`` compare equal to each other but are printed differently.
+    """
+    values = list(call_args) + list(call_kwargs.values())
+    if not all(type(value) in (int, float, complex) for value in values):
+        return None
+    return tuple((type(value), repr(value)) for value in values) + tuple(call_kwargs)
+
+
 def declare_waveform_generator(
     name: str, argtypes: list[tuple[str, ast.ClassicalType]]
 ) -> Callable[..., OQFunctionCall]:
@@ -18,11 +18,18 @@
 from __future__ import annotations
 
 import contextlib
-from typing import TYPE_CHECKING, Iterator, cast
+import functools
+from typing import TYPE_CHECKING, Any, Callable, Iterator, cast
 
 from openpulse import ast
 
-from oqpy.base import ExpressionConvertible, HasToAst, OQPyExpression, optional_ast
+from oqpy.base import (
+    CachedExpressionConvertible,
+    ExpressionConvertible,
+    HasToAst,
+    OQPyExpression,
+    optional_ast,
+)
 from oqpy.classical_types import AstConvertible
 
 if TYPE_CHECKING:
@@ -43,12 +50,18 @@ def Box(program: Program, duration: AstConvertible | None = None) -> Iterator[No
     program._add_statement(ast.Box(optional_ast(program, duration), state.body))
 
 
-def make_duration(time: AstConvertible) -> HasToAst:
+def make_duration(time: AstConvertible) -> HasToAst | CachedExpressionConvertible:
     """Make value into an expression representing a duration."""
+    handler = _DURATION_HANDLERS.get(type(time))
+    if handler is not None:
+        return handler(time)
     if isinstance(time, (float, int)):
-        return OQDurationLiteral(time)
+        return _make_duration_literal(time)
     if hasattr(time, "to_ast"):
         return time  # type: ignore[return-value]
+    if hasattr(time, "_to_cached_oqpy_expression"):
+        # Leave the conversion to to_ast so that it goes through the program's cache.
+        return time  # type: ignore[return-value]
     if hasattr(time, "_to_oqpy_expression"):
         time = cast(ExpressionConvertible, time)
         return time._to_oqpy_expression()
@@ -57,13 +70,41 @@ def make_duration(time: AstConvertible) -> HasToAst:
     )
 
 
+def _make_duration_literal(duration: float) -> OQDurationLiteral:
+    """Return a shared duration literal for the given number of seconds."""
+    # 0.0 and -0.0 compare equal but print differently, so zero is never interned.
+    if duration == 0:
+        return OQDurationLiteral(duration)
+    return _interned_duration_literal(duration)
+
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def _interned_duration_literal(duration: float) -> OQDurationLiteral:
+    return OQDurationLiteral(duration)
+
+
 class OQDurationLiteral(OQPyExpression):
     """An expression corresponding to a duration literal."""
 
+    __slots__ = ("duration",)
+
     def __init__(self, duration: float) -> None:
         super().__init__()
         self.duration = duration
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> OQDurationLiteral:
+        # Duration literals are never modified after construction (and may be shared via
+        # make_duration), so copies can safely refer to the same object.
+        return self
+
     def to_ast(self, program: Program) -> ast.DurationLiteral:
         # Todo (#53): make better units?
         return ast.DurationLiteral(1e9 * self.duration, ast.TimeUnit.ns)
+
+
+# Fast paths for the most common argument types of make_duration, looked up by exact type.
+_DURATION_HANDLERS: dict[type, Callable[[Any], HasToAst]] = {
+    float: _make_duration_literal,
+    int: _make_duration_literal,
+    OQDurationLiteral: lambda time: time,
+}
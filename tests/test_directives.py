@@ -28,21 +28,39 @@ from oqpy.quantum_types import PhysicalQubits
 from oqpy.timing import OQDurationLiteral
 
 
+_EXPECTED_VERSION_STRING = textwrap.dedent(
+    """
+    OPENQASM 2.9;
+    """
+).strip()
+
+
 def test_version_string():
     prog = Program(version="2.9")
 
     with pytest.raises(RuntimeError):
         prog = Program("2.x")
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 2.9;
-        """
-    ).strip()
+    expected = _EXPECTED_VERSION_STRING
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_VARIABLE_DECLARATION = textwrap.dedent(
+    """
+    bool b = true;
+    int[32] i = -4;
+    uint[32] u = 5;
+    duration blah = 100.0ns;
+    float[50] y = 3.3;
+    angle[32] ang;
+    bit[20] arr;
+    bit c;
+    arr[1] = 0;
+    """
+).strip()
+
+
 def test_variable_declaration():
     b = BoolVar(True, "b")
     i = IntVar(-4, "i")
@@ -71,24 +89,34 @@ def test_variable_declaration():
     with pytest.raises(TypeError):
         prog.set(c[0], 1)
 
-    expected = textwrap.dedent(
-        """
-        bool b = true;
-        int[32] i = -4;
-        uint[32] u = 5;
-        duration blah = 100.0ns;
-        float[50] y = 3.3;
-        angle[32] ang;
-        bit[20] arr;
-        bit c;
-        arr[1] = 0;
-        """
-    ).strip()
+    expected = _EXPECTED_VARIABLE_DECLARATION
 
     assert isinstance(arr[14], BitVar)
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_COMPLEX_NUMBERS_DECLARATION = textwrap.dedent(
+    """
+    complex[float[64]] z;
+    complex[float[64]] z1 = 1.0;
+    complex[float[64]] z2 = -1.0;
+    complex[float[64]] z3 = 2.0im;
+    complex[float[64]] z4 = -2.0im;
+    complex[float[64]] z5 = 1.0 + 2.0im;
+    complex[float[64]] z6 = 1.0 - 2.0im;
+    complex[float[64]] z7 = -1.0 + 2.0im;
+    complex[float[64]] z8 = -1.0 - 2.0im;
+    complex[float[64]] z9 = 1.0;
+    complex[float[64]] z10 = -1.0;
+    complex[float[64]] z11 = 2.0im;
+    complex[float[64]] z12 = -2.0im;
+    complex[float[32]] z_with_type1 = 1.2 - 2.1im;
+    complex[float[16]] z_with_type2 = 1.2 - 2.1im;
+    complex[float[16]] z_with_type3 = 1.2 - 2.1im;
+    """
+).strip()
+
+
 def test_complex_numbers_declaration():
     vars = [
         ComplexVar(name="z"),
@@ -114,30 +142,21 @@ def test_complex_numbers_declaration():
     prog = Program(version=None)
     prog.declare(vars)
 
-    expected = textwrap.dedent(
-        """
-        complex[float[64]] z;
-        complex[float[64]] z1 = 1.0;
-        complex[float[64]] z2 = -1.0;
-        complex[float[64]] z3 = 2.0im;
-        complex[float[64]] z4 = -2.0im;
-        complex[float[64]] z5 = 1.0 + 2.0im;
-        complex[float[64]] z6 = 1.0 - 2.0im;
-        complex[float[64]] z7 = -1.0 + 2.0im;
-        complex[float[64]] z8 = -1.0 - 2.0im;
-        complex[float[64]] z9 = 1.0;
-        complex[float[64]] z10 = -1.0;
-        complex[float[64]] z11 = 2.0im;
-        complex[float[64]] z12 = -2.0im;
-        complex[float[32]] z_with_type1 = 1.2 - 2.1im;
-        complex[float[16]] z_with_type2 = 1.2 - 2.1im;
-        complex[float[16]] z_with_type3 = 1.2 - 2.1im;
-        """
-    ).strip()
+    expected = _EXPECTED_COMPLEX_NUMBERS_DECLARATION
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_NON_TRIVIAL_VARIABLE_DECLARATION = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    complex[float[64]] z1 = 5.0;
+    complex[float[64]] z2 = 2 * z1;
+    complex[float[64]] z3 = z2 + 2.0im;
+    """
+).strip()
+
+
 def test_non_trivial_variable_declaration():
     prog = Program()
     z1 = ComplexVar(5, "z1")
@@ -146,18 +165,23 @@ def test_non_trivial_variable_declaration():
     vars = [z1, z2, z3]
     prog.declare(vars)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        complex[float[64]] z1 = 5.0;
-        complex[float[64]] z2 = 2 * z1;
-        complex[float[64]] z3 = z2 + 2.0im;
-        """
-    ).strip()
+    expected = _EXPECTED_NON_TRIVIAL_VARIABLE_DECLARATION
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_VARIABLE_ASSIGNMENT = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] i = 5;
+    i = 8;
+    i = 1;
+    i += 3;
+    i %= 2;
+    """
+).strip()
+
+
 def test_variable_assignment():
     prog = Program()
     i = IntVar(5, name="i")
@@ -169,20 +193,22 @@ def test_variable_assignment():
     with pytest.raises(TypeError):
         prog.set(i, None)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] i = 5;
-        i = 8;
-        i = 1;
-        i += 3;
-        i %= 2;
-        """
-    ).strip()
+    expected = _EXPECTED_VARIABLE_ASSIGNMENT
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_BINARY_EXPRESSIONS = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] i = 5;
+    int[32] j = 2;
+    i = 2 * (i + j);
+    j = 2 % (2 + i) % 2;
+    """
+).strip()
+
+
 def test_binary_expressions():
     prog = Program()
     i = IntVar(5, "i")
@@ -190,19 +216,22 @@ def test_binary_expressions():
     prog.set(i, 2 * (i + j))
     prog.set(j, 2 % (2 + i) % 2)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] i = 5;
-        int[32] j = 2;
-        i = 2 * (i + j);
-        j = 2 % (2 + i) % 2;
-        """
-    ).strip()
+    expected = _EXPECTED_BINARY_EXPRESSIONS
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_MEASURE_RESET = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    bit c;
+    reset $0;
+    c = measure $0;
+    measure $0;
+    """
+).strip()
+
+
 def test_measure_reset():
     prog = Program()
     q = PhysicalQubits[0]
@@ -211,19 +240,25 @@ def test_measure_reset():
     prog.measure(q, c)
     prog.measure(q)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        bit c;
-        reset $0;
-        c = measure $0;
-        measure $0;
-        """
-    ).strip()
+    expected = _EXPECTED_MEASURE_RESET
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_BARE_IF = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] i = 3;
+    if (i <= 0) {
+        i += 1;
+    }
+    if (i != 0) {
+        i = 0;
+    }
+    """
+).strip()
+
+
 def test_bare_if():
     prog = Program()
     i = IntVar(3, "i")
@@ -235,22 +270,29 @@ def test_bare_if():
         with If(prog, i < 0 or i == 0):
             prog.increment(i, 1)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] i = 3;
-        if (i <= 0) {
-            i += 1;
-        }
-        if (i != 0) {
-            i = 0;
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_BARE_IF
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_IF_ELSE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] i = 3;
+    int[32] j = 2;
+    if (i >= 0) {
+        if (j == 0) {
+            i += 1;
+        } else {
+            i -= 1;
+        }
+    } else {
+        i -= 1;
+    }
+    """
+).strip()
+
+
 def test_if_else():
     prog = Program()
     i = IntVar(3, "i")
@@ -267,26 +309,35 @@ def test_if_else():
         with Else(prog):
             prog.decrement(i, 1)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] i = 3;
-        int[32] j = 2;
-        if (i >= 0) {
-            if (j == 0) {
-                i += 1;
-            } else {
-                i -= 1;
-            }
-        } else {
-            i -= 1;
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_IF_ELSE
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_FOR_IN = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] j = 0;
+    waveform wf = {0.1, -1.2, 1.3, 2.4};
+    for int i in [0:4] {
+        j += i;
+    }
+    for int k in {-1, 1, -1, 1} {
+        j -= k;
+    }
+    for int l in {0, 3} {
+        j = l;
+    }
+    for int m in wf {
+        j = m;
+    }
+    for int n in {0.1, 0.5} {
+        j = n;
+    }
+    """
+).strip()
+
+
 def test_for_in():
     prog = Program()
     j = IntVar(0, "j")
@@ -299,30 +350,28 @@ def test_for_in():
         prog.set(j, l)
     with ForIn(prog, wf, "m") as m:
         prog.set(j, m)
+    with ForIn(prog, np.array([0.1, 0.5], dtype=np.float32), "n") as n:
+        prog.set(j, n)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] j = 0;
-        waveform wf = {0.1, -1.2, 1.3, 2.4};
-        for int i in [0:4] {
-            j += i;
-        }
-        for int k in {-1, 1, -1, 1} {
-            j -= k;
-        }
-        for int l in {0, 3} {
-            j = l;
-        }
-        for int m in wf {
-            j = m;
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_FOR_IN
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_WHILE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    int[32] j = 0;
+    while (j < 5) {
+        j += 1;
+    }
+    while (j > 0) {
+        j -= 1;
+    }
+    """
+).strip()
+
+
 def test_while():
     prog = Program()
     j = IntVar(0, "j")
@@ -331,22 +380,21 @@ def test_while():
     with While(prog, j > 0):
         prog.decrement(j, 1)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        int[32] j = 0;
-        while (j < 5) {
-            j += 1;
-        }
-        while (j > 0) {
-            j -= 1;
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_WHILE
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_CREATE_FRAME = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    port storage;
+    frame storage_frame = newframe(storage, 6000000000.0, 0);
+    frame readout_frame;
+    """
+).strip()
+
+
 def test_create_frame():
     prog = Program()
     port = PortVar("storage")
@@ -357,18 +405,23 @@ def test_create_frame():
     with pytest.raises(ValueError):
         frame = FrameVar(port, name="storage_frame")
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        port storage;
-        frame storage_frame = newframe(storage, 6000000000.0, 0);
-        frame readout_frame;
-        """
-    ).strip()
+    expected = _EXPECTED_CREATE_FRAME
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_SUBROUTINE_WITH_RETURN = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    def multiply(int[32] x, int[32] y) -> int[32] {
+        return x * y;
+    }
+    int[32] y = 2;
+    y = multiply(y, 3);
+    """
+).strip()
+
+
 def test_subroutine_with_return():
     prog = Program()
 
@@ -408,20 +461,29 @@ def test_subroutine_with_return():
 
         prog.set(y, add(prog, y, 3))
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        def multiply(int[32] x, int[32] y) -> int[32] {
-            return x * y;
-        }
-        int[32] y = 2;
-        y = multiply(y, 3);
-        """
-    ).strip()
+    expected = _EXPECTED_SUBROUTINE_WITH_RETURN
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_BOX_AND_TIMINGS = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    extern constant(duration, complex[float[64]]) -> waveform;
+    port portname;
+    frame framename = newframe(portname, 1000000000.0, 0);
+    box[500.0ns] {
+        play(framename, constant(100.0ns, 0.5));
+        delay[framename] 2e-05;
+        play(framename, constant(100.0ns, 0.5));
+    }
+    box {
+        play(framename, constant(200.0ns, 0.5));
+    }
+    """
+).strip()
+
+
 def test_box_and_timings():
     constant = declare_waveform_generator("constant", [("length", duration), ("iq", complex128)])
 
@@ -440,26 +502,24 @@ def test_box_and_timings():
         f = FloatVar(200e-9, "f", needs_declaration=False)
         make_duration(f.to_ast(prog))
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        extern constant(duration, complex[float[64]]) -> waveform;
-        port portname;
-        frame framename = newframe(portname, 1000000000.0, 0);
-        box[500.0ns] {
-            play(framename, constant(100.0ns, 0.5));
-            delay[framename] 2e-05;
-            play(framename, constant(100.0ns, 0.5));
-        }
-        box {
-            play(framename, constant(200.0ns, 0.5));
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_BOX_AND_TIMINGS
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_PLAY_CAPTURE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    extern constant(duration, complex[float[64]]) -> waveform;
+    port portname;
+    frame framename = newframe(portname, 1000000000.0, 0);
+    waveform kernel = constant(1000.0ns, 1);
+    play(framename, constant(1000.0ns, 0.5));
+    capture(framename, kernel);
+    """
+).strip()
+
+
 def test_play_capture():
     port = PortVar("portname")
     frame = FrameVar(port, 1e9, name="framename")
@@ -470,21 +530,22 @@ def test_play_capture():
     kernel = WaveformVar(constant(1e-6, iq=1), "kernel")
     prog.capture(frame, kernel)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        extern constant(duration, complex[float[64]]) -> waveform;
-        port portname;
-        frame framename = newframe(portname, 1000000000.0, 0);
-        waveform kernel = constant(1000.0ns, 1);
-        play(framename, constant(1000.0ns, 0.5));
-        capture(framename, kernel);
-        """
-    ).strip()
+    expected = _EXPECTED_PLAY_CAPTURE
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_SET_SHIFT_FREQUENCY = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    port portname;
+    frame framename = newframe(portname, 1000000000.0, 0);
+    set_frequency(framename, 1100000000.0);
+    shift_frequency(framename, 200000000.0);
+    """
+).strip()
+
+
 def test_set_shift_frequency():
     port = PortVar("portname")
     frame = FrameVar(port, 1e9, name="framename")
@@ -493,19 +554,71 @@ def test_set_shift_frequency():
     prog.set_frequency(frame, 1.1e9)
     prog.shift_frequency(frame, 0.2e9)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        port portname;
-        frame framename = newframe(portname, 1000000000.0, 0);
-        set_frequency(framename, 1100000000.0);
-        shift_frequency(framename, 200000000.0);
-        """
-    ).strip()
+    expected = _EXPECTED_SET_SHIFT_FREQUENCY
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_RAMSEY_EXAMPLE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    extern constant(duration, complex[float[64]]) -> waveform;
+    extern gaussian(duration, duration, float[64], float[64]) -> waveform;
+    cal {
+        port q_port;
+        port rx_port;
+        port tx_port;
+        frame q_frame = newframe(q_port, 6431000000.0, 0);
+        frame rx_frame = newframe(rx_port, 5752000000.0, 0);
+        frame tx_frame = newframe(tx_port, 5752000000.0, 0);
+    }
+    defcal readout $2 {
+        play(tx_frame, constant(2400.0ns, 0.2));
+        capture(rx_frame, constant(2400.0ns, 1));
+    }
+    defcal x90 $2 {
+        play(q_frame, gaussian(32.0ns, 8.0ns, 0.2063, 0.0));
+    }
+    cal {
+        for int shot in [0:1000] {
+            duration ramsey_delay = 12000.0ns;
+            angle[32] tppi_angle = 0;
+            for int delay_increment in [0:80] {
+                delay[100000.0ns];
+                set_phase(q_frame, 0);
+                set_phase(rx_frame, 0);
+                set_phase(tx_frame, 0);
+                x90 $2;
+                delay[ramsey_delay];
+                shift_phase(q_frame, tppi_angle);
+                x90 $2;
+                readout $2;
+                tppi_angle += 0.6283185307179586;
+                ramsey_delay += 20.0ns;
+            }
+        }
+    }
+    """
+).strip()
+
+_EXPECTED_DEFCAL_X90_Q2 = textwrap.dedent(
+    """
+    defcal x90 $2 {
+        play(q_frame, gaussian(32.0ns, 8.0ns, 0.2063, 0.0));
+    }
+    """
+).strip()
+
+_EXPECTED_DEFCAL_READOUT_Q2 = textwrap.dedent(
+    """
+    defcal readout $2 {
+        play(tx_frame, constant(2400.0ns, 0.2));
+        capture(rx_frame, constant(2400.0ns, 1));
+    }
+    """
+).strip()
+
+
 def test_ramsey_example():
     prog = Program()
     constant = declare_waveform_generator("constant", [("length", duration), ("iq", complex128)])
@@ -560,70 +673,50 @@ def test_ramsey_example():
                     .increment(ramsey_delay, 20e-9)
                 )
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        extern constant(duration, complex[float[64]]) -> waveform;
-        extern gaussian(duration, duration, float[64], float[64]) -> waveform;
-        cal {
-            port q_port;
-            port rx_port;
-            port tx_port;
-            frame q_frame = newframe(q_port, 6431000000.0, 0);
-            frame rx_frame = newframe(rx_port, 5752000000.0, 0);
-            frame tx_frame = newframe(tx_port, 5752000000.0, 0);
-        }
-        defcal readout $2 {
-            play(tx_frame, constant(2400.0ns, 0.2));
-            capture(rx_frame, constant(2400.0ns, 1));
-        }
-        defcal x90 $2 {
-            play(q_frame, gaussian(32.0ns, 8.0ns, 0.2063, 0.0));
-        }
-        cal {
-            for int shot in [0:1000] {
-                duration ramsey_delay = 12000.0ns;
-                angle[32] tppi_angle = 0;
-                for int delay_increment in [0:80] {
-                    delay[100000.0ns];
-                    set_phase(q_frame, 0);
-                    set_phase(rx_frame, 0);
-                    set_phase(tx_frame, 0);
-                    x90 $2;
-                    delay[ramsey_delay];
-                    shift_phase(q_frame, tppi_angle);
-                    x90 $2;
-                    readout $2;
-                    tppi_angle += 0.6283185307179586;
-                    ramsey_delay += 20.0ns;
-                }
-            }
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_RAMSEY_EXAMPLE
 
-    expect_defcal_x90_q2 = textwrap.dedent(
-        """
-        defcal x90 $2 {
-            play(q_frame, gaussian(32.0ns, 8.0ns, 0.2063, 0.0));
-        }
-        """
-    ).strip()
-
-    expect_defcal_readout_q2 = textwrap.dedent(
-        """
-        defcal readout $2 {
-            play(tx_frame, constant(2400.0ns, 0.2));
-            capture(rx_frame, constant(2400.0ns, 1));
-        }
-        """
-    ).strip()
+    expect_defcal_x90_q2 = _EXPECTED_DEFCAL_X90_Q2
+
+    expect_defcal_readout_q2 = _EXPECTED_DEFCAL_READOUT_Q2
 
     assert prog.to_qasm() == expected
     assert dumps(prog.defcals[("$2", "x90")], indent="    ").strip() == expect_defcal_x90_q2
     assert dumps(prog.defcals[("$2", "readout")], indent="    ").strip() == expect_defcal_readout_q2
 
 
+_EXPECTED_RABI_EXAMPLE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    cal {
+        port zcu216_adc225_0;
+        port zcu216_dac230_0;
+        port zcu216_dac231_0;
+        frame q0_transmon_xy_frame = newframe(zcu216_dac231_0, 3911851971.26885, 0);
+        frame q0_readout_tx_frame = newframe(zcu216_dac230_0, 3571600000, 0);
+        frame q0_readout_rx_frame = newframe(zcu216_adc225_0, 3571600000, 0);
+        waveform rabi_pulse_wf = gaussian(52.0ns, 13.0ns, 1.0, 0.0);
+        waveform readout_waveform_wf = constant(1600.0ns, 0.02);
+        waveform readout_kernel_wf = constant(1600.0ns, 1);
+        for int shot in [1:1000] {
+            set_scale(q0_transmon_xy_frame, -0.2);
+            for int amplitude in [1:101] {
+                delay[200000.0ns] q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
+                set_phase(q0_transmon_xy_frame, 0);
+                set_phase(q0_readout_tx_frame, 0);
+                set_phase(q0_readout_rx_frame, 0);
+                play(q0_transmon_xy_frame, rabi_pulse_wf);
+                barrier q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
+                play(q0_readout_tx_frame, readout_waveform_wf);
+                capture(q0_readout_rx_frame, readout_kernel_wf);
+                barrier q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
+                shift_scale(q0_transmon_xy_frame, 0.004);
+            }
+        }
+    }
+    """
+).strip()
+
+
 def test_rabi_example():
     prog = Program()
     constant = declare_waveform_generator("constant", [("length", duration), ("iq", complex128)])
@@ -657,41 +750,28 @@ def test_rabi_example():
                 .shift_scale(q0_transmon_xy_frame, 0.4 / 100)
             )
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        cal {
-            port zcu216_adc225_0;
-            port zcu216_dac230_0;
-            port zcu216_dac231_0;
-            frame q0_transmon_xy_frame = newframe(zcu216_dac231_0, 3911851971.26885, 0);
-            frame q0_readout_tx_frame = newframe(zcu216_dac230_0, 3571600000, 0);
-            frame q0_readout_rx_frame = newframe(zcu216_adc225_0, 3571600000, 0);
-            waveform rabi_pulse_wf = gaussian(52.0ns, 13.0ns, 1.0, 0.0);
-            waveform readout_waveform_wf = constant(1600.0ns, 0.02);
-            waveform readout_kernel_wf = constant(1600.0ns, 1);
-            for int shot in [1:1000] {
-                set_scale(q0_transmon_xy_frame, -0.2);
-                for int amplitude in [1:101] {
-                    delay[200000.0ns] q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
-                    set_phase(q0_transmon_xy_frame, 0);
-                    set_phase(q0_readout_tx_frame, 0);
-                    set_phase(q0_readout_rx_frame, 0);
-                    play(q0_transmon_xy_frame, rabi_pulse_wf);
-                    barrier q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
-                    play(q0_readout_tx_frame, readout_waveform_wf);
-                    capture(q0_readout_rx_frame, readout_kernel_wf);
-                    barrier q0_transmon_xy_frame, q0_readout_tx_frame, q0_readout_rx_frame;
-                    shift_scale(q0_transmon_xy_frame, 0.004);
-                }
-            }
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_RABI_EXAMPLE
 
     assert prog.to_qasm(encal=True, include_externs=False) == expected
 
 
+_EXPECTED_PROGRAM_ADD = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    extern constant(duration, complex[float[64]]) -> waveform;
+    port p1;
+    frame f1 = newframe(p1, 5000000000.0, 0);
+    waveform wf = constant(100.0ns, 0.5);
+    delay[1000.0ns];
+    defcal x180 $1 {
+        play(f1, wf);
+    }
+    x180 $1;
+    int[32] i = 5;
+    """
+).strip()
+
+
 def test_program_add():
     prog1 = Program()
     constant = declare_waveform_generator("constant", [("length", duration), ("iq", complex128)])
@@ -709,30 +789,29 @@ def test_program_add():
     i = IntVar(5, "i")
     prog2.declare(i)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        extern constant(duration, complex[float[64]]) -> waveform;
-        port p1;
-        frame f1 = newframe(p1, 5000000000.0, 0);
-        waveform wf = constant(100.0ns, 0.5);
-        delay[1000.0ns];
-        defcal x180 $1 {
-            play(f1, wf);
-        }
-        x180 $1;
-        int[32] i = 5;
-        """
-    ).strip()
+    expected = _EXPECTED_PROGRAM_ADD
 
     prog = prog1 + prog2
     assert prog.to_qasm() == expected
+    assert prog1.to_qasm() == "OPENQASM 3.0;\ndelay[1000.0ns];"
 
     with pytest.raises(RuntimeError):
         with If(prog2, i == 0):
             prog = prog1 + prog2
 
 
+_EXPECTED_EXPRESSION_CONVERTIBLE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    duration a1 = 100.0ns;
+    duration a2 = 100.0ns;
+    frame f1;
+    a1 = 2;
+    delay[a2] f1;
+    """
+).strip()
+
+
 def test_expression_convertible():
     @dataclass
     class A:
@@ -745,19 +824,92 @@ def test_expression_convertible():
     prog = Program()
     prog.set(A("a1"), 2)
     prog.delay(A("a2"), frame)
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        duration a1 = 100.0ns;
-        duration a2 = 100.0ns;
-        frame f1;
-        a1 = 2;
-        delay[a2] f1;
-        """
-    ).strip()
+    expected = _EXPECTED_EXPRESSION_CONVERTIBLE
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_PROGRAM_ADD_DOES_NOT_MODIFY_OPERANDS = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    for int i in [0:1] {
+        cal {
+            set_phase(f, 0);
+        }
+        cal {
+            shift_phase(f, 0.5);
+        }
+    }
+    """
+).strip()
+
+
+def test_program_add_does_not_modify_operands():
+    frame = FrameVar(name="f", needs_declaration=False)
+    prog1 = Program()
+    with ForIn(prog1, range(2), "i"):
+        with Cal(prog1):
+            prog1.set_phase(frame, 0)
+        with Cal(prog1):
+            prog1.shift_phase(frame, 0.5)
+    prog2 = Program()
+    prog2.delay(1e-6)
+
+    (prog1 + prog2).to_qasm(encal_declarations=True)
+
+    expected = _EXPECTED_PROGRAM_ADD_DOES_NOT_MODIFY_OPERANDS
+
+    assert dumps(prog1.to_ast(), indent="    ").strip() == expected
+
+
+_EXPECTED_CACHED_EXPRESSION_CONVERTIBLE = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    duration a1 = 100.0ns;
+    frame f1;
+    a1 = 2;
+    delay[a1] f1;
+    delay[a1];
+    """
+).strip()
+
+
+def test_cached_expression_convertible():
+    @dataclass
+    class A:
+        name: str
+        conversions: int = 0
+
+        def _to_cached_oqpy_expression(self):
+            self.conversions += 1
+            return DurationVar(1e-7, self.name)
+
+    a1 = A("a1")
+    frame = FrameVar(name="f1")
+    prog = Program()
+    prog.set(a1, 2)
+    prog.delay(a1, frame)
+    prog.delay(a1)
+    expected = _EXPECTED_CACHED_EXPRESSION_CONVERTIBLE
+    assert prog.to_qasm() == expected
+    assert a1.conversions == 1
+    first_delay, second_delay = prog.to_ast().statements[-2:]
+    assert first_delay.duration is not second_delay.duration
+
+
+_EXPECTED_WAVEFORM_EXTERN_ARG_PASSING = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    extern constant(duration, complex[float[64]]) -> waveform;
+    port p1;
+    frame f1 = newframe(p1, 5000000000.0, 0);
+    play(f1, constant(10.0ns, 0.1));
+    play(f1, constant(20.0ns, 0.2));
+    play(f1, constant(40.0ns, 0.4));
+    play(f1, constant(50.0ns, 0.5));
+    """
+).strip()
+
+
 def test_waveform_extern_arg_passing():
     prog = Program()
     constant = declare_waveform_generator("constant", [("length", duration), ("iq", complex128)])
@@ -767,6 +919,9 @@ def test_waveform_extern_arg_passing():
     prog.play(frame, constant(20e-9, iq=0.2))
     prog.play(frame, constant(length=40e-9, iq=0.4))
     prog.play(frame, constant(iq=0.5, length=50e-9))
+    assert constant(10e-9, 0.1) is constant(10e-9, 0.1)
+    assert constant(10e-9, 1) is not constant(10e-9, 1.0)
+    assert constant(10e-9, iq=0.1) is not constant(10e-9, 0.1)
     with pytest.raises(TypeError):
         prog.play(frame, constant(10e-9, length=10e-9))
     with pytest.raises(TypeError):
@@ -774,22 +929,28 @@ def test_waveform_extern_arg_passing():
     with pytest.raises(TypeError):
         prog.play(frame, constant(10e-9, 0.1, 0.1))
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        extern constant(duration, complex[float[64]]) -> waveform;
-        port p1;
-        frame f1 = newframe(p1, 5000000000.0, 0);
-        play(f1, constant(10.0ns, 0.1));
-        play(f1, constant(20.0ns, 0.2));
-        play(f1, constant(40.0ns, 0.4));
-        play(f1, constant(50.0ns, 0.5));
-        """
-    ).strip()
+    expected = _EXPECTED_WAVEFORM_EXTERN_ARG_PASSING
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_NEEDS_DECLARATION = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    port p1;
+    int[32] i1 = 1;
+    frame f1 = newframe(p1, 5000000000.0, 0);
+    qubit q1;
+    i1 += 1;
+    i2 += 1;
+    set_phase(f1, 0);
+    set_phase(f2, 0);
+    X q1;
+    X q2;
+    """
+).strip()
+
+
 def test_needs_declaration():
     prog = Program()
     i1 = IntVar(1, name="i1")
@@ -807,25 +968,30 @@ def test_needs_declaration():
     prog.gate(q1, "X")
     prog.gate(q2, "X")
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        port p1;
-        int[32] i1 = 1;
-        frame f1 = newframe(p1, 5000000000.0, 0);
-        qubit q1;
-        i1 += 1;
-        i2 += 1;
-        set_phase(f1, 0);
-        set_phase(f2, 0);
-        X q1;
-        X q2;
-        """
-    ).strip()
+    expected = _EXPECTED_NEEDS_DECLARATION
 
     assert prog.to_qasm() == expected
 
 
+_EXPECTED_DISCRETE_WAVEFORM = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    port port;
+    frame frame = newframe(port, 5000000000.0, 0);
+    waveform wfm_float = {-1.2, 1.5, 0.1, 0};
+    waveform wfm_int = {1, 0, 4, -1};
+    waveform wfm_complex = {1.0 + 2.0im, 3.2 - 1.2im, -2.1im, 1.0};
+    waveform wfm_notype = {0.0, -1.0im, 1.2, -1};
+    play(frame, wfm_complex);
+    play(frame, {1, 1, 0, 0});
+    play(frame, {0.0, 0.5, 1.0});
+    play(frame, {0.5, -1.0});
+    play(frame, {0.1, 0.2});
+    play(frame, {0.1 + 0.2im, -0.3im});
+    """
+).strip()
+
+
 def test_discrete_waveform():
     port = PortVar("port")
     frame = FrameVar(port, 5e9, name="frame")
@@ -840,20 +1006,12 @@ def test_discrete_waveform():
     prog.declare([wfm_float, wfm_int, wfm_complex, wfm_notype])
     prog.play(frame, wfm_complex)
     prog.play(frame, [1] * 2 + [0] * 2)
+    prog.play(frame, np.linspace(0, 1, 3))
+    prog.play(frame, np.array([0.5, -1.0], dtype=complex))
+    prog.play(frame, np.array([0.1, 0.2], dtype=np.float32))
+    prog.play(frame, np.array([0.1 + 0.2j, -0.3j], dtype=np.complex64))
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        port port;
-        frame frame = newframe(port, 5000000000.0, 0);
-        waveform wfm_float = {-1.2, 1.5, 0.1, 0};
-        waveform wfm_int = {1, 0, 4, -1};
-        waveform wfm_complex = {1.0 + 2.0im, 3.2 - 1.2im, -2.1im, 1.0};
-        waveform wfm_notype = {0.0, -1.0im, 1.2, -1};
-        play(frame, wfm_complex);
-        play(frame, {1, 1, 0, 0});
-        """
-    ).strip()
+    expected = _EXPECTED_DISCRETE_WAVEFORM
 
     assert prog.to_qasm() == expected
 
@@ -864,12 +1022,15 @@ def test_var_and_expr_matches():
     f1 = FrameVar(p1, 5e9, name="f1")
     assert f1._var_matches(f1)
     assert f1._var_matches(copy.deepcopy(f1))
+    assert not hasattr(f1, "__dict__")
 
     assert expr_matches(f1, f1)
     assert not expr_matches(f1, p1)
     assert not expr_matches(f1, FrameVar(p1, 4e9, name="frame"))
     assert not expr_matches(f1, FrameVar(p2, 5e9, name="frame"))
     assert not expr_matches(BitVar[2]([1, 2], name="a"), BitVar[2]([1], name="a"))
+    nan_var = FloatVar(np.nan, name="nan_var")
+    assert expr_matches(nan_var, nan_var)
 
     prog = Program()
     prog.declare(p1)
@@ -914,9 +1075,19 @@ def test_program_tracks_frame_waveform_vars():
     assert expr_matches(list(prog.frame_vars), [f1, f3, f2])
     assert expr_matches(list(prog.waveform_vars), [constant_wf, discrete_wf])
 
+    # The program can be modified while iterating over the tracked vars
+    for frame in prog.frame_vars:
+        prog.declare(frame)
+    for waveform in prog.waveform_vars:
+        prog.declare(waveform)
+    assert not prog.undeclared_vars
+
 
 def test_make_duration():
     assert expr_matches(make_duration(1e-3), OQDurationLiteral(1e-3))
+    assert make_duration(1e-3) is make_duration(1e-3)
+    assert make_duration(1) is not make_duration(1.0)
+    assert copy.deepcopy(make_duration(1e-3)) is make_duration(1e-3)
     assert expr_matches(make_duration(OQDurationLiteral(1e-4)), OQDurationLiteral(1e-4))
 
     class MyExprConvertible:
@@ -936,6 +1107,26 @@ def test_make_duration():
         make_duration("asdf")
 
 
+_EXPECTED_AUTOENCAL = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    defcalgrammar "openpulse";
+    cal {
+        extern constant(duration, complex[float[64]]) -> waveform;
+        port portname;
+        frame framename = newframe(portname, 1000000000.0, 0);
+        waveform kernel = constant(1000.0ns, 1);
+    }
+    int[32] i = 0;
+    i += 1;
+    cal {
+        play(framename, constant(1000.0ns, 0.5));
+        capture(framename, kernel);
+    }
+    """
+).strip()
+
+
 def test_autoencal():
     port = PortVar("portname")
     frame = FrameVar(port, 1e9, name="framename")
@@ -949,28 +1140,136 @@ def test_autoencal():
         kernel = WaveformVar(constant(1e-6, iq=1), "kernel")
         prog.capture(frame, kernel)
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        defcalgrammar "openpulse";
-        cal {
-            extern constant(duration, complex[float[64]]) -> waveform;
-            port portname;
-            frame framename = newframe(portname, 1000000000.0, 0);
-            waveform kernel = constant(1000.0ns, 1);
-        }
-        int[32] i = 0;
-        i += 1;
-        cal {
-            play(framename, constant(1000.0ns, 0.5));
-            capture(framename, kernel);
+    expected = _EXPECTED_AUTOENCAL
+
+    assert prog.to_qasm(encal_declarations=True) == expected
+
+
+_EXPECTED_MERGE_NESTED_CAL_STATEMENTS = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    defcalgrammar "openpulse";
+    box[1000.0ns] {
+        for int i in [0:1] {
+            cal {
+                set_phase(f, 0);
+                shift_phase(f, 0.5);
+            }
         }
-        """
-    ).strip()
+    }
+    """
+).strip()
+
+
+def test_merge_nested_cal_statements():
+    frame = FrameVar(name="f", needs_declaration=False)
+    prog = Program()
+    with Box(prog, 1e-6):
+        with ForIn(prog, range(2), "i"):
+            with Cal(prog):
+                prog.set_phase(frame, 0)
+            with Cal(prog):
+                prog.shift_phase(frame, 0.5)
+
+    expected = _EXPECTED_MERGE_NESTED_CAL_STATEMENTS
 
     assert prog.to_qasm(encal_declarations=True) == expected
 
 
+def test_to_qasm_cache():
+    prog = Program()
+    i = IntVar(0, "i")
+    prog.increment(i, 1)
+
+    qasm = prog.to_qasm()
+    assert prog.to_qasm() is qasm
+    assert prog.to_qasm(include_externs=False) == qasm
+
+    prog.increment(i, 2)
+    assert prog.to_qasm() == qasm + "\ni += 2;"
+
+    with ForIn(prog, range(2), "j"):
+        with pytest.raises(AssertionError):
+            prog.to_qasm()
+
+
+def test_to_qasm_cache_matches_fresh_conversion():
+    def convert(program, **kwargs):
+        return dumps(program.to_ast(**kwargs), indent="    ").strip()
+
+    frame = FrameVar(PortVar("port"), 5e9, name="frame")
+    prog1 = Program()
+    with ForIn(prog1, range(2), "i"):
+        with Cal(prog1):
+            prog1.set_phase(frame, 0)
+        with Cal(prog1):
+            prog1.shift_phase(frame, 0.5)
+    prog2 = Program()
+    j = IntVar(0, "j")
+    with If(prog2, j == 0):
+        prog2.delay(1e-6)
+
+    qasm1 = prog1.to_qasm()
+    combined = prog1 + prog2
+    assert prog1.to_qasm() is qasm1
+    assert qasm1 == convert(prog1)
+
+    prog1 += prog2
+    prog1.to_qasm()
+    # Completing the if clause of prog2 does not change the programs it was added to.
+    with Else(prog2):
+        prog2.delay(2e-6)
+
+    for program in (combined, prog1, prog2):
+        for encal_declarations in (True, False):
+            qasm = program.to_qasm(encal_declarations=encal_declarations)
+            assert qasm == convert(program, encal_declarations=encal_declarations)
+
+    prog1.version = "2.0"
+    assert prog1.to_qasm().startswith("OPENQASM 2.0;")
+    assert prog1.to_qasm() == convert(prog1)
+
+
+_EXPECTED_RAMSEY_EXAMPLE_BLOG = textwrap.dedent(
+    """
+    OPENQASM 3.0;
+    defcalgrammar "openpulse";
+    cal {
+        extern constant(duration, float[64]) -> waveform;
+        extern gaussian(duration, duration, float[64]) -> waveform;
+        port dac1;
+        port adc0;
+        port dac0;
+        frame tx_frame = newframe(dac1, 5752000000.0, 0);
+        frame rx_frame = newframe(adc0, 5752000000.0, 0);
+        frame xy_frame = newframe(dac0, 6431000000.0, 0);
+    }
+    duration delay_time = 0.0ns;
+    defcal reset $1 {
+        delay[1000000.0ns];
+    }
+    defcal measure $1 {
+        play(tx_frame, constant(2400.0ns, 0.2));
+        capture(rx_frame, constant(2400.0ns, 1));
+    }
+    defcal x90 $1 {
+        play(xy_frame, gaussian(32.0ns, 8.0ns, 0.2063));
+    }
+    for int shot_index in [0:99] {
+        delay_time = 0.0ns;
+        for int delay_index in [0:100] {
+            reset $1;
+            x90 $1;
+            delay[delay_time] $1;
+            x90 $1;
+            measure $1;
+            delay_time += 100.0ns;
+        }
+    }
+    """
+).strip()
+
+
 def test_ramsey_example_blog():
     import oqpy
 
@@ -1026,43 +1325,6 @@ def test_ramsey_example_blog():
 
     full_prog = defcals_prog + ramsey_prog
 
-    expected = textwrap.dedent(
-        """
-        OPENQASM 3.0;
-        defcalgrammar "openpulse";
-        cal {
-            extern constant(duration, float[64]) -> waveform;
-            extern gaussian(duration, duration, float[64]) -> waveform;
-            port dac1;
-            port adc0;
-            port dac0;
-            frame tx_frame = newframe(dac1, 5752000000.0, 0);
-            frame rx_frame = newframe(adc0, 5752000000.0, 0);
-            frame xy_frame = newframe(dac0, 6431000000.0, 0);
-        }
-        duration delay_time = 0.0ns;
-        defcal reset $1 {
-            delay[1000000.0ns];
-        }
-        defcal measure $1 {
-            play(tx_frame, constant(2400.0ns, 0.2));
-            capture(rx_frame, constant(2400.0ns, 1));
-        }
-        defcal x90 $1 {
-            play(xy_frame, gaussian(32.0ns, 8.0ns, 0.2063));
-        }
-        for int shot_index in [0:99] {
-            delay_time = 0.0ns;
-            for int delay_index in [0:100] {
-                reset $1;
-                x90 $1;
-                delay[delay_time] $1;
-                x90 $1;
-                measure $1;
-                delay_time += 100.0ns;
-            }
-        }
-        """
-    ).strip()
+    expected = _EXPECTED_RAMSEY_EXAMPLE_BLOG
 
     assert full_prog.to_qasm(encal_declarations=True) == expected